@@ -5,13 +5,81 @@ Playwrightを使って共有URLから動画をダウンロード
 """
 
 import asyncio
+import contextlib
 import csv
 import json
 import re
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
-from playwright.async_api import async_playwright
+from playwright.async_api import Browser, Playwright, Request, async_playwright
+
+try:
+    import orjson
+except ImportError:  # orjsonが未インストールの場合は標準のjsonを使う
+    orjson = None
+
+# 動画URLの種別と解像度 (例: "..._avo_1280x720.mp4" -> 顔カメラ, "..._as_1920x1080.mp4" -> 画面共有)
+# 両方の目印を含むURLは_avo_を優先する
+_STREAM_PATTERNS = (
+    ("_avo_", "face", re.compile(r"_avo_(\d+x\d+)\.mp4")),
+    ("_as_", "screen", re.compile(r"_as_(\d+x\d+)\.mp4")),
+)
+
+# タイムラインマーカーのaria-label (例: "Sharing Started,0 hours 4 minutes 13 seconds")
+_TIMELINE_RE = re.compile(r"(Sharing (?:Started|Stopped)),(\d+) hours (\d+) minutes (\d+) seconds")
+
+# キャプチャしたリクエストからcurlへ引き継ぐヘッダー
+_FORWARDED_HEADERS = ("accept", "accept-language", "referer", "user-agent")
+
+_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# navigator.webdriverをfalseにしてBot検出を回避
+_WEBDRIVER_PATCH_JS = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => false
+    });
+"""
+
+# タイムラインマーカー (SPAN要素) のaria-labelを取得
+_TIMELINE_LABELS_JS = """() => Array.from(
+    document.querySelectorAll('span.vjs-share-marker-button'),
+    marker => marker.getAttribute('aria-label'),
+).filter(Boolean)"""
+
+# curlの共通オプション (進捗表示なし、エラーは表示)
+# --parallel時は-sでは進捗表示が消えないため--no-progress-meterを使う
+_CURL_BASE_ARGS = ("curl", "--no-progress-meter", "-S")
+# 転送ごとのオプション (--nextでリセットされるため各転送に指定)
+# リダイレクトに追従し、終了コード・ファイル名・エラーメッセージを1行で出力する
+_CURL_TRANSFER_ARGS = ("-L", "-w", "%{exitcode}\t%{filename_effective}\t%{errormsg}\n")
+
+# aria2cのオプション (1ファイルを最大8接続・1MB単位に分割、既存ファイルは上書き)
+_ARIA2C_ARGS = (
+    "aria2c",
+    "--max-connection-per-server=8",
+    "--split=8",
+    "--min-split-size=1M",
+    "--allow-overwrite=true",
+    "--auto-file-renaming=false",
+    "--console-log-level=error",
+    "--summary-interval=0",
+    "--download-result=hide",
+)
+
+# 最初の動画URLを検出してから、もう一方のストリームのURLを待つ時間 (秒)
+_SECOND_STREAM_GRACE = 2.0
+
+# これ以下のサイズの動画ファイルはダウンロード失敗とみなす (0.1 MB)
+_MIN_VIDEO_BYTES = 1024 * 1024 // 10
+
+# ページ読み込み時にブロックするリソース (キャッシュ対策のクエリ付きURLも対象)
+_BLOCKED_RESOURCES = re.compile(r"\.(?:png|jpe?g|gif|svg|ico|woff2?|ttf)(?:[?#]|$)")
 
 
 async def download_zoom_recording(
@@ -32,46 +100,94 @@ async def download_zoom_recording(
     Returns:
         ダウンロードしたファイルパスのリスト
     """
+    async with async_playwright() as p:
+        browser = await _launch_browser(p)
+        try:
+            captured = await _capture_recording(browser, base_filename, share_url, passcode, output_dir)
+        finally:
+            await browser.close()
+
+    if captured is None:
+        return []
+    unique_requests, cookie_str = captured
+    return await _download_videos(unique_requests, cookie_str, base_filename, output_dir)
+
+
+async def _launch_browser(p: Playwright) -> Browser:
+    """Chromiumを起動"""
+    return await p.chromium.launch(
+        headless=True,
+        args=[
+            "--disable-blink-features=AutomationControlled",
+            "--disable-dev-shm-usage",
+            "--disable-gpu",
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--mute-audio",
+        ],
+    )
+
+
+async def _capture_recording(
+    browser: Browser,
+    base_filename: str,
+    share_url: str,
+    passcode: str,
+    output_dir: str,
+) -> tuple[dict[str, dict], str] | None:
+    """
+    起動済みのブラウザで共有ページを開き、動画URLとCookieを取得 (タイムラインはここで保存)
+
+    録画ごとに新しいコンテキストを作成するため、Cookieやセッションは録画間で共有されない
+
+    Returns:
+        (動画URL -> リクエスト情報, Cookieヘッダーの値)。動画が見つからなければNone
+    """
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
     # 動画URLとCookieを格納するリスト
     video_requests: list[dict] = []
+    seen_urls: set[str] = set()
+    seen_streams: set[str] = set()
+    got_video = asyncio.Event()
+    got_all_streams = asyncio.Event()
+
+    context = await browser.new_context(
+        user_agent=_USER_AGENT,
+        viewport={"width": 1280, "height": 720},
+        locale="ja-JP",
+        service_workers="block",
+    )
+    try:
+        # 動画URLの取得に不要な画像・フォントは読み込まない
+        await context.route(_BLOCKED_RESOURCES, lambda route: route.abort())
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=["--disable-blink-features=AutomationControlled"],
-        )
-        user_agent = (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        context = await browser.new_context(
-            user_agent=user_agent,
-            viewport={"width": 1280, "height": 720},
-            locale="ja-JP",
-        )
         page = await context.new_page()
 
         # ネットワークリクエストを監視してssrweb.zoom.usへのリクエストをキャプチャ
-        async def handle_request(request):
-            if "ssrweb.zoom.us" in request.url and ".mp4" in request.url:
+        # ページ内の全リクエストで呼ばれるため、タスクを生成しない同期関数にしている
+        def handle_request(request: Request) -> None:
+            url = request.url
+            if "ssrweb.zoom.us" in url and ".mp4" in url and url not in seen_urls:
+                seen_urls.add(url)
+                # curlに渡すヘッダーのみ保持
                 headers = request.headers
                 video_requests.append(
                     {
-                        "url": request.url,
-                        "headers": headers,
+                        "url": url,
+                        "headers": {k: headers[k] for k in _FORWARDED_HEADERS if k in headers},
                     }
                 )
+                got_video.set()
+                # 顔カメラ・画面共有の両方が揃ったら通知
+                seen_streams.update(marker for marker, _, _ in _STREAM_PATTERNS if marker in url)
+                if len(seen_streams) == len(_STREAM_PATTERNS):
+                    got_all_streams.set()
 
         page.on("request", handle_request)
 
-        # navigator.webdriverをfalseにしてBot検出を回避
-        await page.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => false
-            });
-        """)
+        # Bot検出を回避
+        await page.add_init_script(_WEBDRIVER_PATCH_JS)
 
         print(f"\n{'=' * 60}")
         print(f"Processing: {base_filename}")
@@ -80,7 +196,7 @@ async def download_zoom_recording(
 
         # ページ読み込み
         print("[1/4] Loading page...")
-        await page.goto(share_url, wait_until="networkidle")
+        await page.goto(share_url, wait_until="domcontentloaded")
 
         # パスコード入力
         print("[2/4] Entering passcode...")
@@ -98,139 +214,283 @@ async def download_zoom_recording(
 
         # ネットワークリクエストがキャプチャされるまで待機（最大30秒）
         print("[3/4] Waiting for video requests...")
-        for _ in range(30):
-            if video_requests:
-                break
-            await asyncio.sleep(1)
+        # 見つからなかった場合は後続の処理で報告
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(got_video.wait(), timeout=30)
+        # 最初の動画URLの直後に来るもう一方のストリームを取りこぼさないよう少し待つ
+        # (画面共有のない録画では顔カメラのみのため、猶予時間で打ち切る)
+        if got_video.is_set():
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(got_all_streams.wait(), timeout=_SECOND_STREAM_GRACE)
 
         print("[4/4] Extracting sharing timeline...")
 
-        # タイムラインマーカーが表示されるまで待機（最大10秒）
+        # タイムラインマーカーが現れるまで待機（最大10秒）
         try:
-            await page.wait_for_selector("span.vjs-share-marker-button", timeout=10000)
+            await page.wait_for_selector("span.vjs-share-marker-button", state="attached", timeout=10000)
+            has_markers = True
         except Exception:
-            pass  # タイムラインがない録画もあるため、タイムアウトは無視
+            has_markers = False  # タイムラインがない録画もあるため、タイムアウトは無視
 
         # 画面共有のタイミング情報を取得（SPAN要素のaria-labelから）
-        sharing_timeline = await page.evaluate(r"""() => {
-            const markers = document.querySelectorAll('span.vjs-share-marker-button');
-            const timeline = [];
-            markers.forEach(marker => {
-                const label = marker.getAttribute('aria-label');
-                if (label && (label.includes('Sharing Started') || label.includes('Sharing Stopped'))) {
-                    // "Sharing Started,0 hours 4 minutes 13 seconds" のような形式をパース
-                    const match = label.match(/(Sharing (?:Started|Stopped)),(\d+) hours (\d+) minutes (\d+) seconds/);
-                    if (match) {
-                        const action = match[1];
-                        const hours = parseInt(match[2]);
-                        const minutes = parseInt(match[3]);
-                        const seconds = parseInt(match[4]);
-                        const totalSeconds = hours * 3600 + minutes * 60 + seconds;
-                        const h = String(hours).padStart(2,'0');
-                        const m = String(minutes).padStart(2,'0');
-                        const s = String(seconds).padStart(2,'0');
-                        timeline.push({
-                            action: action,
-                            time: `${h}:${m}:${s}`,
-                            seconds: totalSeconds
-                        });
-                    }
-                }
-            });
-            return timeline;
-        }""")
+        # マーカーがない録画では取得用スクリプトの実行自体を省略
+        sharing_timeline = []
+        if has_markers:
+            labels = await page.evaluate(_TIMELINE_LABELS_JS)
+            sharing_timeline = _parse_sharing_timeline(labels)
 
         # タイムライン情報を保存
         if sharing_timeline:
             timeline_file = f"{output_dir}/{base_filename}_timeline.json"
-            with open(timeline_file, "w", encoding="utf-8") as f:
-                json.dump(sharing_timeline, f, indent=2, ensure_ascii=False)
+            _write_timeline(timeline_file, sharing_timeline)
             print(f"  [i] Saved sharing timeline: {timeline_file} ({len(sharing_timeline)} events)")
         else:
             print("  [i] No sharing timeline found")
 
         # 重複を除去したリクエスト情報を取得
-        unique_requests = {}
-        for req in video_requests:
-            url = req["url"]
-            # URLのベース部分（クエリパラメータ前）で重複判定
-            if "_avo_" in url or "_as_" in url:
-                unique_requests[url] = req
+        unique_requests = {req["url"]: req for req in video_requests if "_avo_" in req["url"] or "_as_" in req["url"]}
 
         print(f"  Found {len(unique_requests)} video request(s)")
 
         if not unique_requests:
             print("  [!] No video requests found!")
-            await browser.close()
-            return []
+            return None
 
-        # Cookieを取得
-        cookies = await context.cookies()
-        cookie_str = "; ".join([f"{c['name']}={c['value']}" for c in cookies])
+        # 動画URLに送信されるCookieのみ取得
+        cookies = await context.cookies(urls=list(unique_requests))
+        cookie_str = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+    finally:
+        await context.close()
 
-        await browser.close()
+    return unique_requests, cookie_str
 
-    # curlを使ってダウンロード（キャプチャしたヘッダーとCookieを使用）
-    import subprocess
 
-    downloaded_files = []
-    for url, req in unique_requests.items():
-        # 解像度情報を抽出
-        if "_avo_" in url:
-            match = re.search(r"_avo_(\d+x\d+)\.mp4", url)
-            resolution = match.group(1) if match else "unknown"
-            suffix = f"_face_{resolution}"
-        elif "_as_" in url:
-            match = re.search(r"_as_(\d+x\d+)\.mp4", url)
+def _parse_sharing_timeline(labels: list[str]) -> list[dict]:
+    """
+    タイムラインマーカーのaria-labelから画面共有の開始/停止イベントを抽出
+
+    Args:
+        labels: マーカー要素のaria-labelのリスト
+
+    Returns:
+        {"action", "time", "seconds"} を持つイベントのリスト
+    """
+    timeline = []
+    for label in labels:
+        match = _TIMELINE_RE.search(label)
+        if match:
+            hours, minutes, seconds = int(match.group(2)), int(match.group(3)), int(match.group(4))
+            timeline.append(
+                {
+                    "action": match.group(1),
+                    "time": f"{hours:02d}:{minutes:02d}:{seconds:02d}",
+                    "seconds": hours * 3600 + minutes * 60 + seconds,
+                }
+            )
+    return timeline
+
+
+def _write_timeline(timeline_file: str, sharing_timeline: list[dict]) -> None:
+    """タイムラインをJSONで保存 (orjsonがあればそちらで書き出す)"""
+    if orjson is not None:
+        Path(timeline_file).write_bytes(orjson.dumps(sharing_timeline, option=orjson.OPT_INDENT_2))
+        return
+    with open(timeline_file, "w", encoding="utf-8") as f:
+        json.dump(sharing_timeline, f, indent=2, ensure_ascii=False)
+
+
+def _video_filename(url: str, base_filename: str, output_dir: str) -> str:
+    """動画URLの種別・解像度から出力ファイル名を決定"""
+    suffix = "_unknown"
+    for marker, kind, pattern in _STREAM_PATTERNS:
+        if marker in url:
+            match = pattern.search(url)
             resolution = match.group(1) if match else "unknown"
-            suffix = f"_screen_{resolution}"
-        else:
-            suffix = "_unknown"
+            suffix = f"_{kind}_{resolution}"
+            break
+    return f"{output_dir}/{base_filename}{suffix}.mp4"
+
 
-        filename = f"{output_dir}/{base_filename}{suffix}.mp4"
+def _video_headers(headers: dict) -> list[str]:
+    """キャプチャしたヘッダーからダウンロード時に送るヘッダー行を作成"""
+    return [
+        f"Accept: {headers.get('accept', '*/*')}",
+        f"Accept-Language: {headers.get('accept-language', 'ja-JP')}",
+        f"Referer: {headers.get('referer', 'https://us06web.zoom.us/')}",
+        f"User-Agent: {headers.get('user-agent', '')}",
+    ]
+
+
+async def _download_videos(
+    unique_requests: dict[str, dict],
+    cookie_str: str,
+    base_filename: str,
+    output_dir: str,
+) -> list[str]:
+    """
+    録画の全ストリームを1つのダウンローダープロセスで並列にダウンロード
+
+    aria2cがインストールされていれば分割ダウンロードを使い、なければcurlを使う
+
+    Returns:
+        ダウンロードに成功したファイルパスのリスト
+    """
+    jobs = {
+        _video_filename(url, base_filename, output_dir): (url, _video_headers(req["headers"]))
+        for url, req in unique_requests.items()
+    }
+    for filename in jobs:
         print(f"  Downloading: {filename}")
+        # 前回の実行で残ったファイルを成功と誤判定しないよう削除しておく
+        Path(filename).unlink(missing_ok=True)
+
+    downloader = "aria2c" if shutil.which("aria2c") else "curl"
+    try:
+        if downloader == "aria2c":
+            errors = await _run_aria2c(jobs, cookie_str)
+        else:
+            errors = await _run_curl(jobs, cookie_str)
+    except Exception as e:
+        print(f"  [✗] Failed: {downloader} - {e}")
+        return []
 
+    downloaded_files = []
+    for filename in jobs:
+        if filename in errors:
+            print(f"  [✗] {errors[filename]}")
+            continue
+
+        # ファイルサイズを確認
         try:
-            headers = req["headers"]
-            curl_cmd = [
-                "curl",
-                "-L",
-                "-o",
-                filename,
-                "-H",
-                f"Accept: {headers.get('accept', '*/*')}",
-                "-H",
-                f"Accept-Language: {headers.get('accept-language', 'ja-JP')}",
-                "-H",
-                f"Referer: {headers.get('referer', 'https://us06web.zoom.us/')}",
-                "-H",
-                f"User-Agent: {headers.get('user-agent', '')}",
-                "-b",
-                cookie_str,
-                url,
-            ]
-            result = subprocess.run(curl_cmd, capture_output=True)
-
-            if result.returncode == 0:
-                # ファイルサイズを確認
-                file_path = Path(filename)
-                if file_path.exists():
-                    file_size = file_path.stat().st_size / (1024 * 1024)
-                    if file_size > 0.1:
-                        downloaded_files.append(filename)
-                        print(f"  [✓] Done: {filename} ({file_size:.1f} MB)")
-                    else:
-                        print(f"  [✗] File too small: {filename} ({file_size:.3f} MB)")
-                else:
-                    print(f"  [✗] File not created: {filename}")
-            else:
-                print(f"  [✗] curl failed: {result.stderr.decode()}")
-        except Exception as e:
-            print(f"  [✗] Failed: {filename} - {e}")
+            size = Path(filename).stat().st_size
+        except FileNotFoundError:
+            print(f"  [✗] File not created: {filename}")
+            continue
+        if size > _MIN_VIDEO_BYTES:
+            downloaded_files.append(filename)
+            print(f"  [✓] Done: {filename} ({size / (1024 * 1024):.1f} MB)")
+        else:
+            print(f"  [✗] File too small: {filename} ({size / (1024 * 1024):.3f} MB)")
 
     return downloaded_files
 
 
+async def _communicate(proc: asyncio.subprocess.Process, stdin: bytes | None = None) -> tuple[bytes, bytes]:
+    """
+    子プロセスの終了を待って出力を取得
+
+    待機中にキャンセルされた場合は子プロセスを終了させてから再送出する
+    (書きかけのファイルを残したままダウンローダーが動き続けないようにする)
+    """
+    try:
+        return await proc.communicate(stdin)
+    except asyncio.CancelledError:
+        with contextlib.suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+        raise
+
+
+async def _run_curl(jobs: dict[str, tuple[str, list[str]]], cookie_str: str) -> dict[str, str]:
+    """
+    curlで全ファイルを並列ダウンロード
+
+    同一ホストへの転送なのでTLS接続はcurl内で再利用される
+
+    Args:
+        jobs: 出力ファイルパス -> (URL, ヘッダー行のリスト)
+        cookie_str: Cookieヘッダーの値
+
+    Returns:
+        失敗したファイルパス -> エラーメッセージ
+    """
+    curl_cmd = [*_CURL_BASE_ARGS, "--parallel", "--parallel-max", str(len(jobs))]
+    for i, (filename, (url, headers)) in enumerate(jobs.items()):
+        if i:
+            curl_cmd.append("--next")
+        curl_cmd += [*_CURL_TRANSFER_ARGS, "-o", filename]
+        for header in headers:
+            curl_cmd += ["-H", header]
+        curl_cmd += ["-b", cookie_str, url]
+
+    proc = await asyncio.create_subprocess_exec(
+        *curl_cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await _communicate(proc)
+
+    # 転送ごとの結果 (-w の出力) をファイル名で引けるようにする
+    results = {}
+    for line in stdout.decode().splitlines():
+        exitcode, filename, errormsg = line.split("\t", 2)
+        results[filename] = (exitcode, errormsg)
+
+    errors = {}
+    for filename in jobs:
+        if filename not in results:
+            errors[filename] = f"curl failed: {stderr.decode()}"
+            continue
+        exitcode, errormsg = results[filename]
+        if not exitcode.isdigit():
+            # curl 7.75未満は%{exitcode}・%{errormsg}を空で出力するため、プロセスの終了コードで判定
+            exitcode, errormsg = str(proc.returncode), stderr.decode().strip()
+        if exitcode != "0":
+            errors[filename] = f"curl failed: {filename} - {errormsg}"
+    return errors
+
+
+async def _run_aria2c(jobs: dict[str, tuple[str, list[str]]], cookie_str: str) -> dict[str, str]:
+    """
+    aria2cで全ファイルを並列ダウンロード (1ファイルを複数接続に分割して取得)
+
+    Args:
+        jobs: 出力ファイルパス -> (URL, ヘッダー行のリスト)
+        cookie_str: Cookieヘッダーの値
+
+    Returns:
+        失敗したファイルパス -> エラーメッセージ
+    """
+    # 入力ファイル形式: URLの行に続けて、インデントしたファイルごとのオプションを書く
+    lines = []
+    for filename, (url, headers) in jobs.items():
+        path = Path(filename)
+        # 前回の中断で残った制御ファイルがあると再開しようとするため削除
+        Path(f"{filename}.aria2").unlink(missing_ok=True)
+        lines += [url, f"  dir={path.parent}", f"  out={path.name}"]
+        lines += [f"  header={header}" for header in [*headers, f"Cookie: {cookie_str}"]]
+    input_file = "\n".join(lines) + "\n"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 失敗・未完了のダウンロードは終了時にセッションファイルへ書き出される
+        session_file = Path(tmp_dir) / "session.txt"
+        proc = await asyncio.create_subprocess_exec(
+            *_ARIA2C_ARGS,
+            f"--max-concurrent-downloads={len(jobs)}",
+            f"--save-session={session_file}",
+            "--input-file=-",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        output, _ = await _communicate(proc, input_file.encode())
+        session = session_file.read_text(encoding="utf-8") if session_file.exists() else ""
+
+    if proc.returncode == 0:
+        return {}
+
+    # セッションファイルのout=から失敗したファイルを特定する
+    names = {Path(filename).name: filename for filename in jobs}
+    failed = [
+        names[option[len("out=") :]]
+        for option in (line.strip() for line in session.splitlines())
+        if option.startswith("out=") and option[len("out=") :] in names
+    ]
+    # 特定できない場合 (起動時のエラーなど) は全ファイルを失敗とみなす
+    message = output.decode().strip()
+    return {filename: f"aria2c failed: {filename} - {message}" for filename in failed or jobs}
+
+
 async def process_batch(csv_path: str, output_dir: str = "./downloads"):
     """
     CSVファイルから複数の録画をバッチ処理
@@ -238,24 +498,60 @@ async def process_batch(csv_path: str, output_dir: str = "./downloads"):
     CSVフォーマット:
     base_filename,url,passcode
     """
+    # 件数だけ先に数え、行は処理しながら読み込む
     with open(csv_path, encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        recordings = list(reader)
+        total = sum(1 for _ in csv.DictReader(f))
 
-    print(f"Loaded {len(recordings)} recordings from {csv_path}")
+    print(f"Loaded {total} recordings from {csv_path}")
 
+    # ページ読み込み (Playwright) と動画のダウンロードを重ねて実行する
+    # 署名付きURLやCookieが古くならないよう、取得はダウンロードの1件先までに留める
+    queue: asyncio.Queue[tuple[str, dict[str, dict], str] | None] = asyncio.Queue(maxsize=1)
     all_files = []
-    for i, rec in enumerate(recordings, 1):
-        print(f"\n[{i}/{len(recordings)}]")
-        files = await download_zoom_recording(
-            base_filename=rec["base_filename"], share_url=rec["url"], passcode=rec["passcode"], output_dir=output_dir
-        )
-        all_files.extend(files)
 
-        # レート制限対策
-        if i < len(recordings):
-            print("Waiting 3 seconds before next download...")
-            await asyncio.sleep(3)
+    async def capture_all(browser: Browser) -> None:
+        with open(csv_path, encoding="utf-8") as f:
+            for i, rec in enumerate(csv.DictReader(f), 1):
+                print(f"\n[{i}/{total}]")
+                # 1件の失敗で実行中のダウンロードを止めないよう、エラーは記録して次へ進む
+                try:
+                    captured = await _capture_recording(
+                        browser,
+                        base_filename=rec["base_filename"],
+                        share_url=rec["url"],
+                        passcode=rec["passcode"],
+                        output_dir=output_dir,
+                    )
+                except Exception as e:
+                    print(f"  [✗] Failed: {rec.get('base_filename')} - {e!r}")
+                    captured = None
+
+                if captured is not None:
+                    await queue.put((rec["base_filename"], *captured))
+                    # 前の録画のダウンロードが終わり、この録画が取り出されるまで次のページは開かない
+                    await queue.join()
+
+                # レート制限対策
+                if i < total:
+                    print("Waiting 3 seconds before next page load...")
+                    await asyncio.sleep(3)
+        await queue.put(None)
+
+    async def download_all() -> None:
+        while (item := await queue.get()) is not None:
+            queue.task_done()
+            base_filename, unique_requests, cookie_str = item
+            all_files.extend(await _download_videos(unique_requests, cookie_str, base_filename, output_dir))
+
+    async with async_playwright() as p:
+        # ブラウザはバッチ全体で1つだけ起動し、録画ごとにコンテキストを作り直す
+        browser = await _launch_browser(p)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(capture_all(browser))
+                tg.create_task(download_all())
+        finally:
+            await browser.close()
 
     print(f"\n{'=' * 60}")
     print(f"Complete! Downloaded {len(all_files)} files")